@@ -1,9 +1,11 @@
 import mod
+import threading
 
+from functools import singledispatchmethod
 from GTRI.networkx_interface import get_component_graphs, graph_to_nx_graph, graph_to_unlabeled_edge_nx_graph, \
     nx_graph_to_gml, rule_combined_graph_to_nx_graph
 from networkx import Graph as NXGraph
-from typing import Dict, Iterable, Tuple, Union
+from typing import Dict, Iterable, Optional, Tuple, Union
 
 
 class CanonicalGraph:
@@ -12,28 +14,28 @@ class CanonicalGraph:
 
         self._canonical_smiles: str = canonicaliser.graph_canonical_smiles(self._graph)
 
-        self._automorphism_group: mod.Graph.AutGroup = self._graph.aut()
+        self._automorphism_group: Optional[mod.Graph.AutGroup] = None
 
     def __eq__(self, other: 'CanonicalGraph') -> bool:
-        return self.canonical_smiles == other.canonical_smiles
+        return self._canonical_smiles == other._canonical_smiles
 
     def __ne__(self, other: 'CanonicalGraph') -> bool:
-        return not self == other
+        return self._canonical_smiles != other._canonical_smiles
 
     def __hash__(self) -> int:
-        return 41 * hash(self.canonical_smiles)
+        return hash(self._canonical_smiles)
 
     def __ge__(self, other: 'CanonicalGraph') -> bool:
-        return not self < other
+        return self._canonical_smiles >= other._canonical_smiles
 
     def __gt__(self, other: 'CanonicalGraph') -> bool:
-        return not self <= other
+        return self._canonical_smiles > other._canonical_smiles
 
     def __le__(self, other: 'CanonicalGraph') -> bool:
-        return self.canonical_smiles <= other.canonical_smiles
+        return self._canonical_smiles <= other._canonical_smiles
 
     def __lt__(self, other: 'CanonicalGraph') -> bool:
-        return self.canonical_smiles < other.canonical_smiles
+        return self._canonical_smiles < other._canonical_smiles
 
     def __str__(self) -> str:
         return str(self.graph)
@@ -64,6 +66,9 @@ class CanonicalGraph:
 
     @property
     def automorphism_generators(self) -> Iterable[mod.Graph.Aut]:
+        if self._automorphism_group is None:
+            self._automorphism_group = self._graph.aut()
+
         return self._automorphism_group.gens
 
     def to_gml(self) -> str:
@@ -88,7 +93,7 @@ class CanonicalRule:
         return not self == other
 
     def __hash__(self) -> int:
-        return 47 * hash(self.canonical_smiles)
+        return hash(self._canonical_smiles)
 
     def __str__(self) -> str:
         return str(self.rule)
@@ -136,38 +141,77 @@ class CanonicalRule:
 class GraphCanonicaliser:
     def __init__(self):
         self._label_db: Dict[str, str] = {}
+        self._label_db_lock: threading.Lock = threading.Lock()
+
+        self._graph_smiles_cache: Dict[int, Tuple[mod.Graph, str]] = {}
+        self._gml_smiles_cache: Dict[str, str] = {}
+        self._rule_smiles_cache: Dict[int, Tuple[mod.Rule, Tuple[str]]] = {}
+        self._gml_graph_cache: Dict[str, CanonicalGraph] = {}
 
     def _relabel_via_database(self, label: str) -> str:
-        if label not in self._label_db:
-            self._label_db[label] = f'{len(self._label_db) + 1}C'
+        relabeled: Optional[str] = self._label_db.get(label)
+
+        if relabeled is None:
+            with self._label_db_lock:
+                relabeled = self._label_db.get(label)
 
-        return self._label_db[label]
+                if relabeled is None:
+                    relabeled = f'{len(self._label_db) + 1}C'
+                    self._label_db[label] = relabeled
+
+        return relabeled
+
+    def prime_labels(self, labels: Iterable[str]):
+        for label in labels:
+            self._relabel_via_database(label)
 
     def graph_canonical_smiles(self, graph: mod.Graph) -> str:
-        return mod.graphGMLString(
-            nx_graph_to_gml(graph_to_unlabeled_edge_nx_graph(graph, lambda x: self._relabel_via_database(x))), add=False
-        ).smiles
+        cache_key: int = id(graph)
+        if cache_key not in self._graph_smiles_cache:
+            self.prime_labels({vertex.stringLabel for vertex in graph.vertices})
+            self.prime_labels({edge.stringLabel for edge in graph.edges})
 
-    def nx_graph_canonical_smiles(self, graph: NXGraph) -> Tuple[str]:
-        components = list(get_component_graphs(graph).keys())
+            gml: str = nx_graph_to_gml(graph_to_unlabeled_edge_nx_graph(graph, self._label_db.__getitem__))
+
+            if gml not in self._gml_smiles_cache:
+                self._gml_smiles_cache[gml] = mod.graphGMLString(gml, add=False).smiles
 
-        return tuple(sorted(self.graph_canonical_smiles(component) for component in components))
+            self._graph_smiles_cache[cache_key] = (graph, self._gml_smiles_cache[gml])
+
+        return self._graph_smiles_cache[cache_key][1]
+
+    def nx_graph_canonical_smiles(self, graph: NXGraph) -> Tuple[str]:
+        return tuple(sorted(self.graph_canonical_smiles(component) for component in get_component_graphs(graph)))
 
     def rule_canonical_smiles(self, rule: mod.Rule) -> Tuple[str]:
-        return self.nx_graph_canonical_smiles(rule_combined_graph_to_nx_graph(rule))
+        cache_key: int = id(rule)
+        if cache_key not in self._rule_smiles_cache:
+            self._rule_smiles_cache[cache_key] = \
+                (rule, self.nx_graph_canonical_smiles(rule_combined_graph_to_nx_graph(rule)))
+
+        return self._rule_smiles_cache[cache_key][1]
 
+    @singledispatchmethod
     def canonical_smiles(self, graph: Union[mod.Graph, mod.Rule, NXGraph]) -> Tuple[str]:
-        if isinstance(graph, mod.Graph):
-            return tuple(self.graph_canonical_smiles(graph))
+        return self.rule_canonical_smiles(graph)
 
-        if isinstance(graph, NXGraph):
-            return self.nx_graph_canonical_smiles(graph)
+    @canonical_smiles.register(mod.Graph)
+    def _graph_smiles(self, graph: mod.Graph) -> Tuple[str]:
+        return (self.graph_canonical_smiles(graph),)
 
-        return self.rule_canonical_smiles(graph)
+    @canonical_smiles.register(NXGraph)
+    def _nx_graph_smiles(self, graph: NXGraph) -> Tuple[str]:
+        return self.nx_graph_canonical_smiles(graph)
 
     def canonicalise_graph(self, graph: mod.Graph) -> CanonicalGraph:
         return CanonicalGraph(graph, self)
 
+    def canonicalise_gml(self, gml: str) -> CanonicalGraph:
+        if gml not in self._gml_graph_cache:
+            self._gml_graph_cache[gml] = self.canonicalise_graph(mod.Graph.fromGMLString(gml, add=False))
+
+        return self._gml_graph_cache[gml]
+
     def canonicalise_graphs(self, graphs: Iterable[mod.Graph]) -> Dict[mod.Graph, CanonicalGraph]:
         return {graph: self.canonicalise_graph(graph) for graph in graphs}
 
@@ -8,7 +8,9 @@ from typing import Dict, Iterable, Optional, Set, Tuple, Union
 
 
 def _edge_to_hashable(edge: mod.Graph.Edge) -> Tuple[mod.Graph.Vertex]:
-    return tuple(sorted([edge.source, edge.target]))
+    source, target = edge.source, edge.target
+
+    return (source, target) if source.id <= target.id else (target, source)
 
 
 class Embedding:
@@ -19,6 +21,8 @@ class Embedding:
 
         self._morphism: Morphism = morphism
 
+        self._hash: Optional[int] = None
+
     def __eq__(self, other: 'Embedding') -> bool:
         return self._host_transition == other._host_transition and self._pattern == other._pattern \
             and self._morphism == other._morphism
@@ -27,7 +31,10 @@ class Embedding:
         return not self == other
 
     def __hash__(self):
-        return 23 * hash(self._host_transition) + 29 * hash(self._pattern) + 31 * hash(self._morphism)
+        if self._hash is None:
+            self._hash = hash((self._host_transition, self._pattern, self._morphism))
+
+        return self._hash
 
     def __ge__(self, other: 'Embedding') -> bool:
         return not self < other
@@ -63,9 +70,16 @@ class Embedding:
         return self.host_transition.maximal_subrule.get_edge(self._morphism[edge.source], self._morphism[edge.target])
 
     def _edge_additions(self) -> Iterable[Tuple[RuleGraph, Morphism]]:
+        image_to_range: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = {
+            image_vertex: range_vertex for range_vertex, image_vertex in self._morphism.items()}
+
+        host_edges: Dict[Tuple[mod.Graph.Vertex], mod.Graph.Edge] = {
+            _edge_to_hashable(pattern_edge): self._pattern_edge_to_host(pattern_edge)
+            for pattern_edge in self.pattern.graph.edges}
+
         for pattern_vertex in self.pattern.graph.vertices:
             existing_edges: Set[Tuple[mod.Graph.Vertex]] = set(
-                _edge_to_hashable(self._pattern_edge_to_host(pattern_edge))
+                _edge_to_hashable(host_edges[_edge_to_hashable(pattern_edge)])
                 for pattern_edge in self.pattern.get_adjacent_edges(pattern_vertex))
 
             for host_edge in self.host_transition.maximal_subrule.get_adjacent_edges(self._morphism[pattern_vertex]):
@@ -76,11 +90,7 @@ class Embedding:
                     if host_edge.source == self._morphism[pattern_vertex] \
                     else host_edge.source
 
-                other_endpoint_range: Optional[mod.Graph.Vertex] = None
-                for range_vertex, image_vertex in self._morphism.items():
-                    if image_vertex == other_endpoint:
-                        other_endpoint_range = range_vertex
-                        break
+                other_endpoint_range: Optional[mod.Graph.Vertex] = image_to_range.get(other_endpoint)
 
                 addition_pattern, addition_morphism = self.pattern.add_edge(pattern_vertex, other_endpoint_range)
 
@@ -121,18 +131,20 @@ class Embedding:
             yield relabel_pattern, relabel_morphism + self._morphism
 
     def _build_embeddings(self, extension_generator: Iterable[Tuple[RuleGraph, Morphism]]) -> Iterable['Embedding']:
-        patterns: Dict[RuleGraph, Set[Morphism]] = {}
+        patterns: Dict[str, Tuple[RuleGraph, Set[Morphism]]] = {}
 
         for pattern, pattern_morphism in extension_generator:
-            if pattern in patterns:
-                original_pattern = next(other_pattern for other_pattern in patterns if other_pattern == pattern)
-                patterns[pattern].update(
+            pattern_key: str = pattern.graph.canonical_smiles
+
+            if pattern_key in patterns:
+                original_pattern, morphisms = patterns[pattern_key]
+                morphisms.update(
                     isomorphism + pattern_morphism for isomorphism in pattern.isomorphisms(original_pattern)
                 )
             else:
-                patterns[pattern] = {pattern_morphism}
+                patterns[pattern_key] = (pattern, {pattern_morphism})
 
-        for pattern, morphisms in patterns.items():
+        for pattern, morphisms in patterns.values():
             for morphism in morphisms:
                 yield Embedding(pattern, self._host_transition, morphism)
 
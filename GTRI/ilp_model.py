@@ -1,5 +1,6 @@
 import json
 
+from collections import Counter, defaultdict
 from docplex.mp.dvar import Var
 from docplex.mp.model import Model
 from docplex.mp.solution import SolveSolution
@@ -53,11 +54,8 @@ class ILPSolution:
                  spurious_transitions: Dict[Transition, List[RuleGraph]]):
         self._solution: SolveSolution = solution
 
-        self._rules: Dict[RuleGraph, List[Transition]] = {
-            rule: list(transitions) for rule, transitions in rules.items()}
-
-        self._spurious_transitions: Dict[Transition, List[RuleGraph]] = {
-            transition: list(rules) for transition, rules in spurious_transitions.items()}
+        self._rules: Dict[RuleGraph, List[Transition]] = rules
+        self._spurious_transitions: Dict[Transition, List[RuleGraph]] = spurious_transitions
 
     def print_information(self):
         print('Solution Summary')
@@ -66,12 +64,15 @@ class ILPSolution:
         print(f' - number of spurious transitions: {len(self._spurious_transitions)}')
         print()
 
+        spurious_counts: Counter = Counter()
+        for rules in self._spurious_transitions.values():
+            spurious_counts.update(rules)
+
         print('Solution Rules')
         for index, (rule, coverage) in enumerate(self._rules.items()):
             print(f'\trule {index} with {rule.rule.number_of_vertices} vertices and {rule.rule.number_of_edges} edges')
             print(f'\t - reference transitions: {len(coverage)}')
-            print(f'\t - spurious transitions: '
-                  f'{len([transition for transition, rules in self._spurious_transitions.items() if rule in rules])}')
+            print(f'\t - spurious transitions: {spurious_counts[rule]}')
 
     def save(self, file_name: str):
         data = {
@@ -104,6 +105,16 @@ class ILPModel:
         self._reference_transitions: Dict[Transition, List[RuleGraph]] = reference_transitions
         self._spurious_transitions: Dict[Transition, List[RuleGraph]] = spurious_transitions
 
+        self._rule_to_reference: Dict[RuleGraph, List[Transition]] = defaultdict(list)
+        for transition, rules in self._reference_transitions.items():
+            for rule in rules:
+                self._rule_to_reference[rule].append(transition)
+
+        self._rule_to_spurious: Dict[RuleGraph, List[Transition]] = defaultdict(list)
+        for transition, rules in self._spurious_transitions.items():
+            for rule in rules:
+                self._rule_to_spurious[rule].append(transition)
+
         self._candidate_rules: Dict[RuleGraph, Var] = {}
         self._candidate_variables: Dict[Var, RuleGraph] = {}
 
@@ -112,56 +123,46 @@ class ILPModel:
             self._candidate_rules[candidate_rule] = candidate_variable
             self._candidate_variables[candidate_variable] = candidate_rule
 
-        self._goal_variables: Dict[Var, Transition] = {}
-        for index, transition in enumerate(self._reference_transitions):
-            goal_variable: Var = self._model.binary_var(f"transition{index}")
-            self._goal_variables[goal_variable] = transition
-
-            self._model.add_constraint(goal_variable >= 1)
-
-            generating_candidate_variables: List[Var] = [self._candidate_rules[candidate] for candidate
-                                                         in self._reference_transitions[transition]]
-            self._model.add_constraint(goal_variable == self._model.logical_or(*generating_candidate_variables))
+        self._model.add_constraints(
+            self._model.sum(self._candidate_rules[candidate] for candidate in candidates) >= 1
+            for candidates in self._reference_transitions.values())
 
         self._distortion_variables: Dict[Var, Transition] = {}
+        distortion_constraints: List = []
         for index, transition in enumerate(self._spurious_transitions):
             error_variable: Var = self._model.binary_var(f"error{index}")
             self._distortion_variables[error_variable] = transition
 
-            for candidate_rule in self._spurious_transitions[transition]:
-                self._model.add_constraint(error_variable >= self._candidate_rules[candidate_rule])
+            distortion_constraints.extend(error_variable >= self._candidate_rules[candidate_rule]
+                                          for candidate_rule in self._spurious_transitions[transition])
+
+        self._model.add_constraints(distortion_constraints)
 
-        rule_variable_sum = self._model.sum(list(self._candidate_variables))
-        distortion_variable_sum = self._model.sum(list(self._distortion_variables))
+        rule_variable_sum = self._model.sum(self._candidate_variables.keys())
+        distortion_variable_sum = self._model.sum(self._distortion_variables.keys())
         self._model.minimize(rule_variable_sum + self._spurious_scaling_factor * distortion_variable_sum)
 
     @staticmethod
     def from_candidates(candidates: Iterable[CandidateRule], spurious_scalar: float) -> 'ILPModel':
-        reference_transitions: Dict[Transition, List[RuleGraph]] = {}
-        spurious_transitions: Dict[Transition, List[RuleGraph]] = {}
+        reference_transitions: Dict[Transition, List[RuleGraph]] = defaultdict(list)
+        spurious_transitions: Dict[Transition, List[RuleGraph]] = defaultdict(list)
 
         candidate_rules: List[RuleGraph] = []
         for candidate in candidates:
             candidate_rules.append(candidate.rule)
 
             for transition in candidate.coverage:
-                if transition not in reference_transitions:
-                    reference_transitions[transition] = []
-
                 reference_transitions[transition].append(candidate.rule)
 
             for transition in candidate.distortion:
-                if transition not in spurious_transitions:
-                    spurious_transitions[transition] = []
-
                 spurious_transitions[transition].append(candidate.rule)
 
-        return ILPModel(candidate_rules, reference_transitions, spurious_transitions, spurious_scalar)
+        return ILPModel(candidate_rules, dict(reference_transitions), dict(spurious_transitions), spurious_scalar)
 
     def print_information(self):
         self._model.print_information()
         print(f' - number of candidate rules: {len(self._candidate_variables)}')
-        print(f' - number of transitions to cover: {len(self._goal_variables)}')
+        print(f' - number of transitions to cover: {len(self._reference_transitions)}')
         print(f' - number of spurious transitions: {len(self._distortion_variables)}')
 
     def solve(self) -> ILPSolution:
@@ -175,17 +176,10 @@ class ILPModel:
                 continue
 
             rule = self._candidate_variables[variable]
-            rules[rule] = [transition for transition in self._reference_transitions
-                           if rule in self._reference_transitions[transition]]
-
-            for transition, candidates in self._spurious_transitions.items():
-                if rule not in candidates:
-                    continue
-
-                if transition not in spurious_transition:
-                    spurious_transition[transition] = []
+            rules[rule] = list(self._rule_to_reference.get(rule, ()))
 
-                spurious_transition[transition].append(rule)
+            for transition in self._rule_to_spurious.get(rule, ()):
+                spurious_transition.setdefault(transition, []).append(rule)
 
         return ILPSolution(solution, rules, spurious_transition)
 
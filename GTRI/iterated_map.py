@@ -1,10 +1,12 @@
 import mod
 
+from collections import defaultdict
+from concurrent.futures import as_completed, Future, ThreadPoolExecutor
 from GTRI.canonicalisation import CanonicalGraph, CanonicalRule, GraphCanonicaliser
 from GTRI.rule_builder import RuleBuilder
 from GTRI.rule_graph import RuleGraph
 from GTRI.transition import Transition
-from typing import Dict, Iterable, List, Optional, Set
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 
 specialisation_label_settings: mod.LabelSettings = mod.LabelSettings(mod.LabelType.Term,
@@ -63,12 +65,11 @@ class IteratedMap:
 
         self._canonicaliser: GraphCanonicaliser = canonicaliser
 
-        self._minimal_rules: Dict[RuleGraph, List[Transition]] = {}
+        minimal_rules: Dict[RuleGraph, List[Transition]] = defaultdict(list)
         for transition in self._transitions:
-            if transition.minimal_subrule not in self._minimal_rules:
-                self._minimal_rules[transition.minimal_subrule] = []
+            minimal_rules[transition.minimal_subrule].append(transition)
 
-            self._minimal_rules[transition.minimal_subrule].append(transition)
+        self._minimal_rules: Dict[RuleGraph, List[Transition]] = dict(minimal_rules)
 
         self._transition_system: mod.DG = mod.DG(graphPolicy=mod.IsomorphismPolicy.Check,
                                                  labelSettings=specialisation_label_settings)
@@ -102,6 +103,26 @@ class IteratedMap:
     def has_transition(self, transition: Transition) -> bool:
         return transition in self._transitions
 
+    def _enumerate_hyper_edge_transitions(self, rule_name: str, rule_smiles: Tuple[str],
+                                          hyper_edge: mod.DGHyperEdge) -> Set[Transition]:
+        transitions: Set[Transition] = set()
+
+        vertex_mapper: mod.DGVertexMapper = mod.DGVertexMapper(hyper_edge)
+
+        for map_index, (hyper_edge_rule, vertex_map) in enumerate(vertex_mapper):
+            if self._canonicaliser.rule_canonical_smiles(hyper_edge_rule) != rule_smiles:
+                continue
+
+            transition_rule: Optional[RuleGraph] = RuleGraph.from_rule(
+                _rule_from_vertex_map(f"{rule_name}_{hyper_edge.id}_{map_index}", vertex_map),
+                self._canonicaliser
+            )
+
+            if transition_rule:
+                transitions.add(Transition.intern(transition_rule))
+
+        return transitions
+
     def enumerate_applications(self, rule: CanonicalRule) -> Iterable[Transition]:
         strategy: mod.DGStrat = (mod.addSubset(graph.graph for graph in self._input_graphs) >> rule.rule)
 
@@ -109,31 +130,21 @@ class IteratedMap:
 
         hyper_edges: List[mod.DGHyperEdge] = [edge for edge in self._transition_system.edges if rule.rule in edge.rules]
 
+        rule_name: str = rule.name[4:]
+        rule_smiles: Tuple[str] = rule.canonical_smiles
+
         generated_transitions: Set[Transition] = set()
-        for index, hyper_edge in enumerate(hyper_edges):
-            vertex_mapper: mod.DGVertexMapper = mod.DGVertexMapper(hyper_edge)
-
-            vertex_maps: List[mod.VertexMapUnionGraphUnionGraph] = [
-                vertex_map for hyper_edge_rule, vertex_map in vertex_mapper
-                if self._canonicaliser.canonicalise_rule(hyper_edge_rule) == rule
-            ]
-
-            print(f"\t\tFound {len(generated_transitions)} transitions. "
-                  f"Processing hyper edge {index + 1}/{len(hyper_edges)} "
-                  f"with {len(vertex_maps)} element maps...",
-                  end='\r')
-
-            new_transitions: Set[Transition] = set()
-            for map_index, vertex_map in enumerate(vertex_maps):
-                transition_rule: Optional[RuleGraph] = RuleGraph.from_rule(
-                    _rule_from_vertex_map(f"{rule.name[4:]}_{hyper_edge.id}_{map_index}", vertex_map),
-                    self._canonicaliser
-                )
-
-                if transition_rule:
-                    new_transitions.add(Transition(transition_rule))
-
-            generated_transitions.update(new_transitions)
+        with ThreadPoolExecutor() as executor:
+            futures: List[Future] = [executor.submit(self._enumerate_hyper_edge_transitions,
+                                                     rule_name, rule_smiles, hyper_edge)
+                                     for hyper_edge in hyper_edges]
+
+            for index, future in enumerate(as_completed(futures)):
+                generated_transitions.update(future.result())
+
+                print(f"\t\tFound {len(generated_transitions)} transitions. "
+                      f"Processed hyper edge {index + 1}/{len(hyper_edges)}...",
+                      end='\r')
 
         print()
         return generated_transitions
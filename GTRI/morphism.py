@@ -2,16 +2,21 @@ import mod
 
 
 from GTRI.canonicalisation import CanonicalGraph
-from typing import Dict, Iterable, Iterator, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+_automorphism_morphism_cache: Dict[int, Tuple[CanonicalGraph, Tuple['Morphism', ...]]] = {}
 
 
 class Morphism:
     def __init__(self, vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex]):
         self._vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = vertex_map
 
-        self._fingerprint: Tuple[Tuple[mod.Graph.Vertex, mod.Graph.Vertex]] = tuple(sorted(
-            (range_vertex, image_vertex) for range_vertex, image_vertex in self._vertex_map.items()
-        ))
+        self._fingerprint: Tuple[Tuple[mod.Graph.Vertex, mod.Graph.Vertex]] = tuple(sorted(self._vertex_map.items()))
+
+        self._hash: int = 37 * hash(self._fingerprint)
+
+        self._is_identity: bool = False
 
     def __eq__(self, other: 'Morphism') -> bool:
         return self._fingerprint == other._fingerprint
@@ -20,7 +25,7 @@ class Morphism:
         return not self == other
 
     def __hash__(self) -> int:
-        return 37 * hash(self._fingerprint)
+        return self._hash
 
     def __ge__(self, other: 'Morphism') -> bool:
         return self._fingerprint >= other._fingerprint
@@ -44,40 +49,81 @@ class Morphism:
         return len(self._fingerprint)
 
     def __neg__(self) -> 'Morphism':
-        return Morphism({image_vertex: range_vertex for range_vertex, image_vertex in self.items()})
+        if self._is_identity:
+            return self
+
+        return Morphism({image_vertex: range_vertex for range_vertex, image_vertex in self._vertex_map.items()})
 
     def __add__(self, other: 'Morphism') -> 'Morphism':
-        return Morphism({range_vertex: other[image_vertex] for range_vertex, image_vertex in self.items()})
+        if self._is_identity and self._vertex_map.keys() == other._vertex_map.keys():
+            return other
+
+        if other._is_identity:
+            return self
+
+        other_vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = other._vertex_map
+
+        return Morphism({range_vertex: other_vertex_map[image_vertex]
+                         for range_vertex, image_vertex in self._vertex_map.items()})
 
     @staticmethod
     def _identity(graph: mod.Graph) -> 'Morphism':
-        return Morphism({vertex: vertex for vertex in graph.vertices})
+        identity: Morphism = Morphism({vertex: vertex for vertex in graph.vertices})
+        identity._is_identity = True
+
+        return identity
 
     @staticmethod
     def _from_automorphism(graph: mod.Graph, automorphism: mod.Graph.Aut) -> 'Morphism':
         return Morphism({vertex: automorphism[vertex] for vertex in graph.vertices})
 
     @staticmethod
-    def _from_automorphism_generators(graph: CanonicalGraph) -> Iterable['Morphism']:
-        for automorphism_generator in graph.automorphism_generators:
-            yield Morphism._from_automorphism(graph.graph, automorphism_generator)
+    def _from_automorphism_generators(graph: CanonicalGraph) -> Tuple['Morphism', ...]:
+        cache_key: int = id(graph)
+        if cache_key not in _automorphism_morphism_cache:
+            morphisms: Tuple[Morphism, ...] = tuple(
+                Morphism._from_automorphism(graph.graph, automorphism_generator)
+                for automorphism_generator in graph.automorphism_generators
+            ) + (Morphism._identity(graph.graph),)
 
-        yield Morphism._identity(graph.graph)
+            _automorphism_morphism_cache[cache_key] = (graph, morphisms)
+
+        return _automorphism_morphism_cache[cache_key][1]
 
     def items(self) -> Iterable[Tuple[mod.Graph.Vertex, mod.Graph.Vertex]]:
         return self._vertex_map.items()
 
     def canonicalise(self, range: CanonicalGraph, image: CanonicalGraph) -> 'Morphism':
-        smallest_candidate: Morphism = self
-
-        for range_automorphism in Morphism._from_automorphism_generators(range):
-            partial_candidate: Morphism = range_automorphism + self
-
-            for image_automorphism in Morphism._from_automorphism_generators(image):
-                candidate: Morphism = partial_candidate + image_automorphism
-
-                if candidate < smallest_candidate:
-                    smallest_candidate = candidate
-
-        return smallest_candidate
+        range_automorphisms: Tuple[Morphism, ...] = Morphism._from_automorphism_generators(range)
+        image_automorphisms: Tuple[Morphism, ...] = Morphism._from_automorphism_generators(image)
+
+        range_vertices: List[mod.Graph.Vertex] = [range_vertex for range_vertex, _ in self._fingerprint]
+
+        original_images: Tuple[mod.Graph.Vertex, ...] = tuple(image_vertex for _, image_vertex in self._fingerprint)
+        smallest_images: Tuple[mod.Graph.Vertex, ...] = original_images
+
+        for range_automorphism in range_automorphisms:
+            permuted_images: Iterable[mod.Graph.Vertex]
+            if range_automorphism._is_identity:
+                permuted_images = original_images
+            else:
+                range_vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = range_automorphism._vertex_map
+                permuted_images = [self._vertex_map[range_vertex_map[range_vertex]]
+                                   for range_vertex in range_vertices]
+
+            for image_automorphism in image_automorphisms:
+                candidate_images: Tuple[mod.Graph.Vertex, ...]
+                if image_automorphism._is_identity:
+                    candidate_images = tuple(permuted_images)
+                else:
+                    image_vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = image_automorphism._vertex_map
+                    candidate_images = tuple(image_vertex_map[image_vertex] for image_vertex in permuted_images)
+
+                if candidate_images < smallest_images:
+                    smallest_images = candidate_images
+
+        if smallest_images is original_images:
+            return self
+
+        return Morphism(dict(zip(range_vertices, smallest_images)))
 
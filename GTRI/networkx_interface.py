@@ -73,13 +73,11 @@ def graph_to_unlabeled_edge_nx_graph(graph: mod.Graph, relabel: Callable[[str],
 def nx_graph_to_gml(graph: NXGraph, node_dereference: Callable[[Any], int] = lambda x: x) -> str:
     out = ['graph [']
 
-    for node in graph.nodes:
-        label = graph.nodes[node]['label']
+    for node, label in graph.nodes(data='label'):
         out.append(f'\tnode [ id {node_dereference(node)} label "{label}" ]')
 
-    for (source, target) in graph.edges:
-        label = graph.edges[source, target]['label']
-        out.append(f'\tedge [ source {node_dereference(source)} target {node_dereference(target)}'
+    for source, target, label in graph.edges(data='label'):
+        out.append(f'\tedge [ source {node_dereference(source)} target {node_dereference(target)} '
                    f'label "{label}" ]')
 
     out.append(']')
@@ -3,47 +3,50 @@ import mod
 from typing import Dict, List, Set, Tuple, Union
 
 
-class EdgeTuple(Tuple[int, int]):
-    def __new__(cls, edge: Tuple[int, int]):
-        return super().__new__(cls, sorted(edge))
+def _edge_key(source: int, target: int) -> Tuple[int, int]:
+    return (source, target) if source <= target else (target, source)
 
 
 class RuleSideGraph:
     def __init__(self, name: str):
         self._name: str = name
 
-        self._elements: Dict[Union[int, EdgeTuple], str] = {}
+        self._vertices: Dict[int, str] = {}
+        self._edges: Dict[Tuple[int, int], str] = {}
 
     @property
     def vertices(self) -> Dict[int, str]:
-        return {element: label for element, label in self._elements.items() if isinstance(element, int)}
+        return self._vertices
 
     @property
-    def edges(self) -> Dict[EdgeTuple, str]:
-        return {element: label for element, label in self._elements.items() if not isinstance(element, int)}
+    def edges(self) -> Dict[Tuple[int, int], str]:
+        return self._edges
 
-    def has_element(self, element: Union[int, EdgeTuple]) -> bool:
-        return element in self._elements
+    def _elements(self, element: Union[int, Tuple[int, int]]) -> Dict[Union[int, Tuple[int, int]], str]:
+        return self._vertices if isinstance(element, int) else self._edges
 
-    def label(self, element: Union[int, EdgeTuple]) -> str:
-        return self._elements[element]
+    def has_element(self, element: Union[int, Tuple[int, int]]) -> bool:
+        return element in self._elements(element)
 
-    def add_element(self, element: Union[int, EdgeTuple], label: str):
-        self._elements[element] = label
+    def label(self, element: Union[int, Tuple[int, int]]) -> str:
+        return self._elements(element)[element]
 
-    def remove_element(self, element: Union[int, EdgeTuple]):
-        del self._elements[element]
+    def add_element(self, element: Union[int, Tuple[int, int]], label: str):
+        self._elements(element)[element] = label
+
+    def remove_element(self, element: Union[int, Tuple[int, int]]):
+        del self._elements(element)[element]
 
     def to_gml(self, indent: int = 1) -> str:
         indent_string = "\t" * indent
 
         output = [f"{indent_string}{self._name} ["]
 
-        for element, label in self._elements.items():
-            if isinstance(element, int):
-                output.append(f"{indent_string}\tnode [ id {element} label \"{label}\" ]")
-            else:
-                output.append(f"{indent_string}\tedge [ source {element[0]} target {element[1]} label \"{label}\" ]")
+        for vertex, label in self._vertices.items():
+            output.append(f"{indent_string}\tnode [ id {vertex} label \"{label}\" ]")
+
+        for edge, label in self._edges.items():
+            output.append(f"{indent_string}\tedge [ source {edge[0]} target {edge[1]} label \"{label}\" ]")
 
         output.append(f"{indent_string}]")
 
@@ -60,14 +63,14 @@ class RuleBuilder:
 
     @property
     def vertices(self) -> Set[int]:
-        return set(self._left.vertices.keys()).union(self._context.vertices.keys()).union(self._right.vertices.keys())
+        return self._left.vertices.keys() | self._context.vertices.keys() | self._right.vertices.keys()
 
     @property
-    def edges(self) -> Set[EdgeTuple]:
-        return set(self._left.edges.keys()).union(self._context.edges.keys()).union(self._right.edges.keys())
+    def edges(self) -> Set[Tuple[int, int]]:
+        return self._left.edges.keys() | self._context.edges.keys() | self._right.edges.keys()
 
     @staticmethod
-    def _add_edge_vertices(edge: EdgeTuple, target_graph: RuleSideGraph, alternative_graphs: List[RuleSideGraph]):
+    def _add_edge_vertices(edge: Tuple[int, int], target_graph: RuleSideGraph, alternative_graphs: List[RuleSideGraph]):
         for vertex in edge:
             if not target_graph.has_element(vertex) and\
                     (len(alternative_graphs) == 0 or
@@ -94,7 +97,7 @@ class RuleBuilder:
 
         return builder
 
-    def _add_side_element(self, element: Union[int, EdgeTuple], label: str,
+    def _add_side_element(self, element: Union[int, Tuple[int, int]], label: str,
                           side: RuleSideGraph, opposite_side: RuleSideGraph):
         if self._context.has_element(element):
             context_label = self._context.label(element)
@@ -113,10 +116,10 @@ class RuleBuilder:
 
         side.add_element(element, label)
 
-    def _add_left_element(self, element: Union[int, EdgeTuple], label: str):
+    def _add_left_element(self, element: Union[int, Tuple[int, int]], label: str):
         self._add_side_element(element, label, self._left, self._right)
 
-    def _add_context_element(self, element: Union[int, EdgeTuple], label: str):
+    def _add_context_element(self, element: Union[int, Tuple[int, int]], label: str):
         if self._left.has_element(element):
             self._left.remove_element(element)
 
@@ -125,19 +128,19 @@ class RuleBuilder:
 
         self._context.add_element(element, label)
 
-    def _add_right_element(self, element: Union[int, EdgeTuple], label: str):
+    def _add_right_element(self, element: Union[int, Tuple[int, int]], label: str):
         self._add_side_element(element, label, self._right, self._left)
 
-    def _add_side_edge_vertices(self, edge: EdgeTuple, side: RuleSideGraph):
+    def _add_side_edge_vertices(self, edge: Tuple[int, int], side: RuleSideGraph):
         self._add_edge_vertices(edge, side, [self._context])
 
     def has_vertex(self, id: int) -> bool:
-        return id in self.vertices
+        return self._left.has_element(id) or self._context.has_element(id) or self._right.has_element(id)
 
     def has_edge(self, source: int, target: int) -> bool:
-        edge = EdgeTuple((source, target))
+        edge = _edge_key(source, target)
 
-        return edge in self.edges
+        return self._left.has_element(edge) or self._context.has_element(edge) or self._right.has_element(edge)
 
     def add_left_vertex(self, id: int, label: str):
         self._add_left_element(id, label)
@@ -149,19 +152,19 @@ class RuleBuilder:
         self._add_right_element(id, label)
 
     def add_left_edge(self, source: int, target: int, label: str):
-        edge = EdgeTuple((source, target))
+        edge = _edge_key(source, target)
         self._add_side_edge_vertices(edge, self._left)
 
         self._add_left_element(edge, label)
 
     def add_context_edge(self, source: int, target: int, label: str):
-        edge = EdgeTuple((source, target))
+        edge = _edge_key(source, target)
         self._add_edge_vertices(edge, self._context, [self._left, self._right])
 
         self._add_context_element(edge, label)
 
     def add_right_edge(self, source: int, target: int, label: str):
-        edge = EdgeTuple((source, target))
+        edge = _edge_key(source, target)
         self._add_side_edge_vertices(edge, self._right)
 
         self._add_right_element(edge, label)
@@ -169,9 +172,13 @@ class RuleBuilder:
     def add_context_graph(self, graph: mod.Graph):
         vertex_id_map = {}
 
+        next_vertex_id = 1 + max(self.vertices, default=-1)
+
         for vertex in graph.vertices:
-            vertex_id_map[vertex.id] = 1 + max(self.vertices) if len(self.vertices) > 0 else 0
-            self.add_context_vertex(vertex_id_map[vertex.id], vertex.stringLabel)
+            vertex_id_map[vertex.id] = next_vertex_id
+            self.add_context_vertex(next_vertex_id, vertex.stringLabel)
+
+            next_vertex_id += 1
 
         for edge in graph.edges:
             self.add_context_edge(vertex_id_map[edge.source.id], vertex_id_map[edge.target.id], edge.stringLabel)
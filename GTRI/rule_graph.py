@@ -1,18 +1,39 @@
 import mod
+import sys
 
+from concurrent.futures import ThreadPoolExecutor
 from GTRI.canonicalisation import CanonicalGraph, CanonicalRule, GraphCanonicaliser
 from GTRI.morphism import Morphism
 from GTRI.networkx_interface import graph_to_nx_graph, nx_graph_to_gml
 from GTRI.rule_builder import RuleBuilder
-from itertools import chain
+from collections import Counter, defaultdict
+from itertools import chain, count
 from networkx import connected_components
 from networkx import Graph as NXGraph
 from networkx.algorithms.isomorphism import GraphMatcher
-from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 
 _isomorphism_label_settings: mod.LabelSettings = mod.LabelSettings(mod.LabelType.String, mod.LabelRelation.Isomorphism)
 
+_automorphism_group_size_cap: int = 10000
+
+_rule_graph_counter: Iterator[int] = count()
+
+_wl_refinement_rounds: int = 3
+
+
+def _wl_colour_histogram(nx_graph: NXGraph) -> Tuple:
+    colours: Dict[int, Any] = {node: label for node, label in nx_graph.nodes(data='label')}
+
+    for _ in range(_wl_refinement_rounds):
+        colours = {node: (colours[node],
+                          tuple(sorted((nx_graph.edges[node, neighbour]["label"], colours[neighbour])
+                                       for neighbour in nx_graph[node])))
+                   for node in nx_graph.nodes}
+
+    return tuple(sorted(colours.values()))
+
 
 def _is_combined(label: str) -> bool:
     return label.find(';') >= 0
@@ -27,7 +48,7 @@ def _has_abstract_label(element: Union[mod.Graph.Vertex, mod.Graph.Edge]) -> boo
 
 
 def _split_label(label: str) -> (Optional[str], Optional[str]):
-    labels: List[str] = label.split(';')
+    labels: List[str] = label.split(';', 1)
 
     left_label: Optional[str] = labels[0] if labels[0] else None
     right_label: Optional[str] = labels[1] if len(labels) > 1 and labels[1] else None
@@ -58,13 +79,6 @@ def _combine_element_labels(left_element: Union[mod.Rule.LeftGraph.Vertex, mod.R
 
 
 def _compare_labels(supergraph_label: Optional[str], subgraph_label: Optional[str]) -> bool:
-    if subgraph_label and supergraph_label and _is_combined(subgraph_label) and _is_combined(supergraph_label):
-        left_subgraph_label, right_subgraph_label = _split_label(subgraph_label)
-        left_supergraph_label, right_supergraph_label = _split_label(supergraph_label)
-
-        return _compare_labels(left_supergraph_label, left_subgraph_label) \
-            and _compare_labels(right_supergraph_label, right_subgraph_label)
-
     if not supergraph_label:
         return not subgraph_label
 
@@ -74,8 +88,28 @@ def _compare_labels(supergraph_label: Optional[str], subgraph_label: Optional[st
     return subgraph_label == supergraph_label
 
 
+def _split_label_for_matching(label: str) -> Union[str, Tuple[Optional[str], Optional[str]]]:
+    return _split_label(label) if _is_combined(label) else label
+
+
 def _compare_elements(supergraph_element: Dict[str, Any], subgraph_element: Dict[str, Any]) -> bool:
-    return _compare_labels(supergraph_element["label"], subgraph_element["label"])
+    supergraph_label = supergraph_element["split_label"]
+    subgraph_label = subgraph_element["split_label"]
+
+    if subgraph_label == "*":
+        return True
+
+    if type(subgraph_label) is tuple:
+        if type(supergraph_label) is not tuple:
+            return False
+
+        return _compare_labels(supergraph_label[0], subgraph_label[0]) \
+            and _compare_labels(supergraph_label[1], subgraph_label[1])
+
+    if type(supergraph_label) is tuple:
+        return False
+
+    return subgraph_label == supergraph_label
 
 
 def _equal_elements(graph1_element: Dict[str, Any], graph2_element: Dict[str, Any]) -> bool:
@@ -109,8 +143,7 @@ def _nx_graph_to_mod_graph(nx_graph: NXGraph, canonicaliser: GraphCanonicaliser)
 
             principal_nodes.extend(new_principal_nodes)
 
-    return canonicaliser.canonicalise_graph(mod.Graph.fromGMLString(nx_graph_to_gml(nx_graph), add=False
-    ))
+    return canonicaliser.canonicalise_gml(nx_graph_to_gml(nx_graph))
 
 
 def _rule_to_nx_graph(rule: mod.Rule) -> NXGraph:
@@ -134,24 +167,103 @@ def _match_to_morphism(range: 'RuleGraph', image: 'RuleGraph', match: Dict[int,
     })
 
 
+class _MonomorphismMatcher(GraphMatcher):
+    def __init__(self, supergraph: 'RuleGraph', subgraph: 'RuleGraph'):
+        super().__init__(supergraph._nx_graph, subgraph._nx_graph,
+                         node_match=_compare_elements, edge_match=_compare_elements)
+
+        self._supergraph_degrees: Dict[int, int] = supergraph._node_degrees
+        self._supergraph_signatures: Dict[int, Counter] = supergraph._node_signatures
+        self._subgraph_degrees: Dict[int, int] = subgraph._node_degrees
+        self._subgraph_signatures: Dict[int, Counter] = subgraph._concrete_node_signatures
+
+    def semantic_feasibility(self, supergraph_node: int, subgraph_node: int) -> bool:
+        if self._subgraph_degrees[subgraph_node] > self._supergraph_degrees[supergraph_node]:
+            return False
+
+        supergraph_signature: Counter = self._supergraph_signatures[supergraph_node]
+        for label, count in self._subgraph_signatures[subgraph_node].items():
+            if supergraph_signature[label] < count:
+                return False
+
+        return super().semantic_feasibility(supergraph_node, subgraph_node)
+
+
+class _IsomorphismMatcher(GraphMatcher):
+    def __init__(self, graph: 'RuleGraph', other_graph: 'RuleGraph'):
+        super().__init__(graph._nx_graph, other_graph._nx_graph,
+                         node_match=_equal_elements, edge_match=_equal_elements)
+
+        self._graph_signatures: Dict[int, Counter] = graph._node_signatures
+        self._other_graph_signatures: Dict[int, Counter] = other_graph._node_signatures
+
+    def semantic_feasibility(self, graph_node: int, other_graph_node: int) -> bool:
+        if self._graph_signatures[graph_node] != self._other_graph_signatures[other_graph_node]:
+            return False
+
+        return super().semantic_feasibility(graph_node, other_graph_node)
+
+
 class RuleGraph:
     def __init__(self, graph: CanonicalGraph, name: str, canonicaliser: GraphCanonicaliser):
         self._canonicaliser: GraphCanonicaliser = canonicaliser
         self._name: str = name
 
         self._graph: CanonicalGraph = graph
+        self._canonical_key: str = sys.intern(graph.canonical_smiles)
+        self._hash: int = 19 * hash(self._canonical_key)
+        self._sort_key: int = next(_rule_graph_counter)
+
         self._nx_graph: NXGraph = graph_to_nx_graph(self._graph.graph, use_indices=True)
 
+        for _, data in self._nx_graph.nodes(data=True):
+            data["split_label"] = _split_label_for_matching(data["label"])
+
+        for _, _, data in self._nx_graph.edges(data=True):
+            data["split_label"] = _split_label_for_matching(data["label"])
+
+        self._node_degrees: Dict[int, int] = dict(self._nx_graph.degree)
+
+        self._node_signatures: Dict[int, Counter] = {}
+        self._concrete_node_signatures: Dict[int, Counter] = {}
+        for node in self._nx_graph.nodes:
+            neighbour_labels: List[str] = [self._nx_graph.nodes[neighbour]["label"]
+                                           for neighbour in self._nx_graph[node]]
+
+            self._node_signatures[node] = Counter(neighbour_labels)
+            self._concrete_node_signatures[node] = Counter(label for label in neighbour_labels
+                                                           if label.find('*') < 0)
+
+        self._vertices_by_id: Dict[int, mod.Graph.Vertex] = {vertex.id: vertex for vertex in graph.vertices}
+
+        self._edges_by_endpoints: Dict[Tuple[int, int], mod.Graph.Edge] = {}
+        adjacent_edges: Dict[int, List[mod.Graph.Edge]] = defaultdict(list)
+        for edge in graph.edges:
+            source_id, target_id = edge.source.id, edge.target.id
+
+            self._edges_by_endpoints[(source_id, target_id) if source_id <= target_id
+                                     else (target_id, source_id)] = edge
+
+            if edge.stringLabel != "no_edge":
+                adjacent_edges[source_id].append(edge)
+                adjacent_edges[target_id].append(edge)
+
+        self._adjacent_edges: Dict[int, List[mod.Graph.Edge]] = dict(adjacent_edges)
+
         self._rule: Optional[CanonicalRule] = None
+        self._wl_histogram: Optional[Tuple] = None
+
+        self._label_signature: Optional[Counter] = None
+        self._concrete_label_signature: Optional[Counter] = None
 
     def __eq__(self, other: 'RuleGraph') -> bool:
-        return self._graph == other._graph
+        return self._canonical_key is other._canonical_key
 
     def __ne__(self, other: 'RuleGraph') -> bool:
         return not self == other
 
     def __hash__(self) -> int:
-        return 19 * hash(self._graph)
+        return self._hash
 
     def __ge__(self, other: 'RuleGraph') -> bool:
         return not self < other
@@ -176,6 +288,10 @@ class RuleGraph:
     def graph(self) -> CanonicalGraph:
         return self._graph
 
+    @property
+    def sort_key(self) -> int:
+        return self._sort_key
+
     @property
     def abstract_vertices(self) -> Iterable[mod.Graph.Vertex]:
         return (vertex for vertex in self.graph.vertices if _has_abstract_label(vertex))
@@ -188,6 +304,24 @@ class RuleGraph:
     def abstract_elements(self) -> Iterable[Union[mod.Graph.Vertex, mod.Graph.Edge]]:
         return chain(self.abstract_vertices, self.abstract_edges)
 
+    @property
+    def label_signature(self) -> Counter:
+        if self._label_signature is None:
+            labels: List[str] = [label for _, label in self._nx_graph.nodes(data='label')]
+            labels.extend(label for _, _, label in self._nx_graph.edges(data='label'))
+
+            self._label_signature = Counter(labels)
+
+        return self._label_signature
+
+    @property
+    def concrete_label_signature(self) -> Counter:
+        if self._concrete_label_signature is None:
+            self._concrete_label_signature = Counter({label: count for label, count in self.label_signature.items()
+                                                      if label.find('*') < 0})
+
+        return self._concrete_label_signature
+
     @property
     def rule(self) -> CanonicalRule:
         if not self._rule:
@@ -206,16 +340,47 @@ class RuleGraph:
 
         return RuleGraph(graph, rule.name, canonicaliser)
 
+    @staticmethod
+    def from_rules_parallel(rules: Iterable[mod.Rule], canonicaliser: GraphCanonicaliser,
+                            max_workers: Optional[int] = None) -> List[Optional['RuleGraph']]:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(lambda rule: RuleGraph.from_rule(rule, canonicaliser), rules))
+
     @staticmethod
     def load(data: Dict[str, str], canonicaliser: GraphCanonicaliser) -> 'RuleGraph':
         return RuleGraph(canonicaliser.canonicalise_graph(mod.graphGMLString(data["gml"], add=False)),
                          data["name"], canonicaliser)
 
-    def _compute_automorphisms(self) -> Iterable[Morphism]:
-        graph_matcher: GraphMatcher = GraphMatcher(self._nx_graph, self._nx_graph)
+    def _enumerate_automorphisms_exhaustively(self) -> Iterable[Morphism]:
+        graph_matcher: GraphMatcher = _IsomorphismMatcher(self, self)
 
         for isomorphism in graph_matcher.isomorphisms_iter():
-            yield Morphism(isomorphism)
+            yield _match_to_morphism(self, self, isomorphism)
+
+    def _compute_automorphisms(self) -> Iterable[Morphism]:
+        generators: Tuple[Morphism, ...] = Morphism._from_automorphism_generators(self._graph)
+
+        automorphisms: Set[Morphism] = {Morphism._identity(self._graph.graph)}
+        frontier: List[Morphism] = list(automorphisms)
+
+        while frontier:
+            next_frontier: List[Morphism] = []
+
+            for automorphism in frontier:
+                for generator in generators:
+                    product: Morphism = automorphism + generator
+
+                    if product not in automorphisms:
+                        automorphisms.add(product)
+                        next_frontier.append(product)
+
+            if len(automorphisms) > _automorphism_group_size_cap:
+                yield from self._enumerate_automorphisms_exhaustively()
+                return
+
+            frontier = next_frontier
+
+        yield from automorphisms
 
     def _to_rule(self) -> CanonicalRule:
         builder: RuleBuilder = RuleBuilder(self.name)
@@ -250,26 +415,29 @@ class RuleGraph:
         return self._canonicaliser.canonicalise_rule(builder.to_mod_rule())
 
     def get_vertex(self, vertex_id: int) -> mod.Graph.Vertex:
-        return next(vertex for vertex in self.graph.vertices if vertex.id == vertex_id)
+        return self._vertices_by_id[vertex_id]
 
     def get_edge(self, source: mod.Graph.Vertex, target: mod.Graph.Vertex) -> Optional[mod.Graph.Edge]:
-        for edge in self.graph.edges:
-            if (edge.source == source and edge.target == target) or (edge.source == target and edge.target == source):
-                return edge
+        source_id, target_id = source.id, target.id
 
-        return None
+        return self._edges_by_endpoints.get((source_id, target_id) if source_id <= target_id
+                                            else (target_id, source_id))
 
     def get_adjacent_edges(self, vertex: mod.Graph.Vertex) -> Iterable[mod.Graph.Edge]:
-        for edge in self.graph.edges:
-            if edge.stringLabel == "no_edge":
-                continue
+        return self._adjacent_edges.get(vertex.id, [])
+
+    def _label_nx_graph(self) -> NXGraph:
+        graph: NXGraph = NXGraph()
 
-            if edge.source == vertex or edge.target == vertex:
-                yield edge
+        graph.add_nodes_from((node, {"label": label}) for node, label in self._nx_graph.nodes(data='label'))
+        graph.add_edges_from((source, target, {"label": label})
+                             for source, target, label in self._nx_graph.edges(data='label'))
+
+        return graph
 
     def relabel_element(self, element: Union[mod.Graph.Vertex, mod.Graph.Edge],
                         new_label: str) -> Tuple['RuleGraph', Morphism]:
-        new_nx_graph: NXGraph = self._nx_graph.copy()
+        new_nx_graph: NXGraph = self._label_nx_graph()
         element_id: str
         if type(element) is mod.Graph.Vertex:
             element_id = str(element.id)
@@ -299,7 +467,7 @@ class RuleGraph:
         return self.relabel_element(element, full_new_label)
 
     def add_edge(self, source: mod.Graph.Vertex, target: Optional[mod.Graph.Vertex]) -> Tuple['RuleGraph', Morphism]:
-        new_nx_graph: NXGraph = self._nx_graph.copy()
+        new_nx_graph: NXGraph = self._label_nx_graph()
 
         target_id: int
         if target:
@@ -362,28 +530,35 @@ class RuleGraph:
 
         subrule: RuleGraph = RuleGraph.from_rule(builder.to_mod_rule(), self._canonicaliser)
 
-        vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = {}
-        for vertex_id, subgraph_vertex_id in vertex_id_map.items():
-            vertex: mod.Graph.Vertex = next(vertex for vertex in self.graph.vertices if vertex.id == vertex_id)
-            subgraph_vertex: mod.Graph.Vertex = next(vertex for vertex in subrule.graph.vertices
-                                                     if vertex.id == subgraph_vertex_id)
-
-            vertex_map[subgraph_vertex] = vertex
+        vertex_map: Dict[mod.Graph.Vertex, mod.Graph.Vertex] = {
+            subrule._vertices_by_id[subgraph_vertex_id]: self._vertices_by_id[vertex_id]
+            for vertex_id, subgraph_vertex_id in vertex_id_map.items()}
 
         return subrule, Morphism(vertex_map)
 
+    @property
+    def _wl_colour_fingerprint(self) -> Tuple:
+        if self._wl_histogram is None:
+            self._wl_histogram = _wl_colour_histogram(self._nx_graph)
+
+        return self._wl_histogram
+
     def isomorphisms(self, other: 'RuleGraph') -> Iterable[Morphism]:
-        graph_matcher: GraphMatcher = GraphMatcher(other._nx_graph, self._nx_graph,
-                                                   node_match=_equal_elements, edge_match=_equal_elements)
+        if self._wl_colour_fingerprint != other._wl_colour_fingerprint:
+            return
+
+        graph_matcher: GraphMatcher = _IsomorphismMatcher(other, self)
 
         for isomorphism in graph_matcher.isomorphisms_iter():
             yield _match_to_morphism(other, self, isomorphism)
 
-    def embed(self, subgraph: 'RuleGraph') -> Iterable[Morphism]:
-        graph_matcher: GraphMatcher = GraphMatcher(self._nx_graph, subgraph._nx_graph,
-                                                   node_match=_compare_elements, edge_match=_compare_elements)
+    def embed_raw(self, subgraph: 'RuleGraph') -> Iterable[Dict[int, int]]:
+        graph_matcher: GraphMatcher = _MonomorphismMatcher(self, subgraph)
 
-        for monomorphism in graph_matcher.subgraph_monomorphisms_iter():
+        yield from graph_matcher.subgraph_monomorphisms_iter()
+
+    def embed(self, subgraph: 'RuleGraph') -> Iterable[Morphism]:
+        for monomorphism in self.embed_raw(subgraph):
             yield - _match_to_morphism(self, subgraph, monomorphism)
 
     def save(self) -> Dict[str, str]:
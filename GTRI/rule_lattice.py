@@ -1,7 +1,38 @@
+import sys
+import time
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from GTRI.embedding import Embedding
 from GTRI.rule_graph import RuleGraph
 from GTRI.transition import Transition
-from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from typing import Deque, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+_parallel_embedding_threshold: int = 16
+
+_progress_interval: float = 0.1
+_last_progress_time: float = 0.0
+
+
+def _progress(message: str):
+    global _last_progress_time
+
+    if not sys.stdout.isatty():
+        return
+
+    now: float = time.monotonic()
+    if now - _last_progress_time < _progress_interval:
+        return
+
+    _last_progress_time = now
+    print(message, end='\r')
+
+_interned_patterns: Dict[RuleGraph, RuleGraph] = {}
+
+
+def _intern_pattern(pattern: RuleGraph) -> RuleGraph:
+    return _interned_patterns.setdefault(pattern, pattern)
 
 
 def build_minimal_rule_lattice(reference_transitions: Iterable[Transition],
@@ -17,10 +48,10 @@ def build_minimal_rule_lattice(reference_transitions: Iterable[Transition],
                                                    if transition.can_embed(root.pattern)))
 
     while rule_lattice.active_node:
-        rule_lattice.resolve_node()
+        rule_lattice.resolve_level()
 
-    print()
-    print()
+    if sys.stdout.isatty():
+        print()
 
     return rule_lattice
 
@@ -28,37 +59,56 @@ def build_minimal_rule_lattice(reference_transitions: Iterable[Transition],
 class LatticeNode:
     def __init__(self, embeddings: Iterable[Embedding]):
         self._embeddings: List[Embedding] = list(embeddings)
+        self._embedding_patterns: List[RuleGraph] = [embedding.pattern for embedding in self._embeddings]
+        self._embedding_hosts: List[Transition] = [embedding.host_transition for embedding in self._embeddings]
 
         self._pattern: Optional[RuleGraph] = None
-        patterns: Set[RuleGraph] = set(embedding.pattern for embedding in self._embeddings)
+        patterns: Set[RuleGraph] = set(self._embedding_patterns)
         if len(patterns) == 1:
-            self._pattern = list(patterns)[0]
+            self._pattern = _intern_pattern(list(patterns)[0])
 
+        self._host_transitions: Optional[FrozenSet[Transition]] = None
         self._coverage: Optional[Tuple[Transition]] = None
+        self._coverage_mask: Optional[int] = None
 
         self._successors: Optional[List['LatticeNode']] = None
 
     def __eq__(self, other: 'LatticeNode') -> bool:
-        return self._pattern == other._pattern
+        return self._pattern is other._pattern
 
     def __ne__(self, other: 'LatticeNode') -> bool:
         return not self == other
 
     def __hash__(self) -> int:
-        return 37 * hash(self._pattern)
+        return 37 * id(self._pattern)
 
     @property
     def pattern(self) -> Optional[RuleGraph]:
         return self._pattern
 
     @property
-    def host_transitions(self) -> Iterable[Transition]:
-        return set(embedding.host_transition for embedding in self._embeddings)
+    def host_transitions(self) -> FrozenSet[Transition]:
+        if self._host_transitions is None:
+            self._host_transitions = frozenset(self._embedding_hosts)
+
+        return self._host_transitions
+
+    @property
+    def coverage_mask(self) -> int:
+        if self._coverage_mask is None:
+            mask: int = 0
+            for transition in self.host_transitions:
+                mask |= 1 << transition.uid
+
+            self._coverage_mask = mask
+
+        return self._coverage_mask
 
     @property
     def coverage(self) -> Tuple[Transition]:
         if not self._coverage:
-            self._coverage = tuple(sorted(self.host_transitions))
+            self._coverage = tuple(sorted(self.host_transitions,
+                                          key=lambda transition: transition.maximal_subrule.sort_key))
 
         return self._coverage
 
@@ -70,26 +120,41 @@ class LatticeNode:
             yield from self._successors
             return
 
-        extensions: Dict[RuleGraph, Set[Embedding]] = {}
-
-        for index, embedding in enumerate(self._embeddings):
-            print()
+        extensions: Dict[str, Tuple[RuleGraph, Set[Embedding]]] = {}
 
-            embedding_extensions: List[Embedding] = list(embedding.extensions())
+        extension_lists: Iterable[List[Embedding]]
+        if len(self._embeddings) > _parallel_embedding_threshold:
+            with ThreadPoolExecutor() as executor:
+                extension_lists = list(executor.map(lambda embedding: list(embedding.extensions()),
+                                                    self._embeddings))
+        else:
+            extension_lists = (list(embedding.extensions()) for embedding in self._embeddings)
 
-            print(f"\t\tSearching for maximal common subrule. "
-                  f"Processing embedding {index + 1}/{len(self._embeddings)} "
-                  f"with {len(embedding_extensions)} possible extensions...", end='\033[F')
+        for index, embedding_extensions in enumerate(extension_lists):
+            _progress(f"\t\tSearching for maximal common subrule. "
+                      f"Processing embedding {index + 1}/{len(self._embeddings)} "
+                      f"with {len(embedding_extensions)} possible extensions...")
 
             for extension in embedding_extensions:
-                if extension.pattern not in extensions:
-                    extensions[extension.pattern] = set()
+                extension_key: str = extension.pattern.graph.canonical_smiles
 
-                extensions[extension.pattern].add(extension)
+                if extension_key not in extensions:
+                    extensions[extension_key] = (extension.pattern, set())
 
-        for extension, embeddings in extensions.items():
+                extensions[extension_key][1].add(extension)
+
+        for _, embeddings in extensions.values():
             yield LatticeNode(embeddings)
 
+    def _release(self):
+        if self._host_transitions is None:
+            self._host_transitions = frozenset(self._embedding_hosts)
+
+        self._embeddings = None
+        self._embedding_patterns = None
+        self._embedding_hosts = None
+        self._successors = None
+
     def get_maximum_common_subrule(self) -> 'LatticeNode':
         if self._successors:
             return self
@@ -97,7 +162,7 @@ class LatticeNode:
         successors: List[LatticeNode] = []
 
         for child in self.successors():
-            if child.coverage == self.coverage:
+            if child.coverage_mask == self.coverage_mask:
                 return child.get_maximum_common_subrule()
 
             successors.append(child)
@@ -107,17 +172,25 @@ class LatticeNode:
 
 
 class CandidateRule:
-    def __init__(self, node: LatticeNode, distortion: Iterable[Transition]):
+    def __init__(self, node: LatticeNode, distortion_mask: int, spurious_transitions: List[Transition]):
         self._coverage: List[Transition] = list(node.host_transitions)
-        self._distortion: List[Transition] = list(distortion)
         self._rule: RuleGraph = node.pattern
 
+        self._distortion_mask: int = distortion_mask
+        self._spurious_transitions: List[Transition] = spurious_transitions
+
+        self._distortion: Optional[List[Transition]] = None
+
     @property
     def coverage(self) -> Iterable[Transition]:
         return self._coverage
 
     @property
     def distortion(self) -> Iterable[Transition]:
+        if self._distortion is None:
+            self._distortion = [transition for index, transition in enumerate(self._spurious_transitions)
+                                if self._distortion_mask >> index & 1]
+
         return self._distortion
 
     @property
@@ -126,7 +199,7 @@ class CandidateRule:
 
     @property
     def amount_of_distortion(self) -> int:
-        return len(self._distortion)
+        return self._distortion_mask.bit_count()
 
 
 class RuleLattice:
@@ -134,12 +207,20 @@ class RuleLattice:
         self._roots: List[LatticeNode] = [root]
         self._nodes: Dict[LatticeNode, Set[LatticeNode]] = {self._roots[0]: set()}
 
+        self._spurious_transitions: List[Transition] = list(spurious_transitions)
+        self._pattern_embed_masks: Dict[RuleGraph, int] = {}
+        self._mcs_cache: Dict[RuleGraph, LatticeNode] = {}
+        self._distortion_masks: Dict[LatticeNode, int] = {
+            self._roots[0]: (1 << len(self._spurious_transitions)) - 1
+        }
+
         self._candidates: Dict[LatticeNode, CandidateRule] = {
-            self._roots[0]: CandidateRule(self._roots[0], spurious_transitions)
+            self._roots[0]: CandidateRule(self._roots[0], self._distortion_masks[self._roots[0]],
+                                          self._spurious_transitions)
         }
 
-        self._node_queue: List[LatticeNode] = []
-        if self._candidates[self._roots[0]].amount_of_distortion > 0:
+        self._node_queue: Deque[LatticeNode] = deque()
+        if self._distortion_masks[self._roots[0]]:
             self._node_queue.append(self._roots[0])
 
         self._seen_nodes: Set[LatticeNode] = {self._roots[0]}
@@ -155,12 +236,28 @@ class RuleLattice:
 
         return self._node_queue[0]
 
+    def _pattern_embed_mask(self, pattern: RuleGraph) -> int:
+        mask: Optional[int] = self._pattern_embed_masks.get(pattern)
+
+        if mask is None:
+            mask = 0
+            for index, transition in enumerate(self._spurious_transitions):
+                if transition.can_embed(pattern):
+                    mask |= 1 << index
+
+            self._pattern_embed_masks[pattern] = mask
+
+        return mask
+
     def _add_node(self, node: LatticeNode, parent: LatticeNode) -> Optional[LatticeNode]:
         if node in self._seen_nodes:
             return None
         self._seen_nodes.add(node)
 
-        maximal_common_subrule: LatticeNode = node.get_maximum_common_subrule()
+        maximal_common_subrule: Optional[LatticeNode] = self._mcs_cache.get(node.pattern)
+        if maximal_common_subrule is None:
+            maximal_common_subrule = node.get_maximum_common_subrule()
+            self._mcs_cache[node.pattern] = maximal_common_subrule
 
         if maximal_common_subrule in self._candidates:
             if maximal_common_subrule not in self._nodes[parent]:
@@ -171,27 +268,53 @@ class RuleLattice:
         self._nodes[parent].add(maximal_common_subrule)
         self._nodes[maximal_common_subrule] = set()
 
+        distortion_mask: int = self._distortion_masks[parent] \
+            & self._pattern_embed_mask(maximal_common_subrule.pattern)
+        self._distortion_masks[maximal_common_subrule] = distortion_mask
+
         self._candidates[maximal_common_subrule] = CandidateRule(
-            maximal_common_subrule, (transition for transition in self._candidates[parent].distortion
-                                     if transition.can_embed(maximal_common_subrule.pattern))
+            maximal_common_subrule, distortion_mask, self._spurious_transitions
         )
 
-        if self._candidates[maximal_common_subrule].amount_of_distortion > 0:
+        if distortion_mask:
             self._node_queue.append(maximal_common_subrule)
 
-        print(f'\t\tFound {len(self)} candidate rules with {self.queue_length} open...', end='\r')
+        _progress(f'\t\tFound {len(self)} candidate rules with {self.queue_length} open...')
         return maximal_common_subrule
 
     def resolve_node(self):
-        active_node: LatticeNode = self.active_node
-        self._node_queue = self._node_queue[1:]
+        active_node: Optional[LatticeNode] = self.active_node
 
         if not active_node:
             return
 
+        self._node_queue.popleft()
+
         for child in active_node.successors():
             self._add_node(child, active_node)
 
+        active_node._release()
+
+    def resolve_level(self):
+        level: List[LatticeNode] = list(self._node_queue)
+        self._node_queue.clear()
+
+        if not level:
+            return
+
+        successor_lists: List[List[LatticeNode]]
+        if len(level) > 1:
+            with ThreadPoolExecutor() as executor:
+                successor_lists = list(executor.map(lambda node: list(node.successors()), level))
+        else:
+            successor_lists = [list(level[0].successors())]
+
+        for parent, children in zip(level, successor_lists):
+            for child in children:
+                self._add_node(child, parent)
+
+            parent._release()
+
     def __iter__(self) -> Iterator[CandidateRule]:
         return iter(self._candidates.values())
 
@@ -203,7 +326,7 @@ class RuleLattice:
         result._roots = list(self._roots)
         result._nodes = dict(self._nodes)
         result._candidates = dict(self._candidates)
-        result._node_queue = list(self._node_queue)
+        result._node_queue = deque(self._node_queue)
 
         if other is not None:
             result._roots.extend(root for root in other._roots if root and root not in self._roots)
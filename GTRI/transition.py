@@ -3,24 +3,25 @@ import mod
 from GTRI.canonicalisation import GraphCanonicaliser
 from GTRI.morphism import Morphism
 from GTRI.rule_graph import RuleGraph
-from typing import Optional
+from itertools import count
+from typing import Dict, Iterator, Optional
+
+
+_transition_counter: Iterator[int] = count()
+
+_interned_transitions: Dict[RuleGraph, 'Transition'] = {}
 
 
 class Transition:
     def __init__(self, rule_graph: RuleGraph):
         self._maximal_subrule: RuleGraph = rule_graph
 
+        self._uid: int = next(_transition_counter)
+
         self._minimal_subrule: Optional[RuleGraph] = None
         self._minimal_subrule_anchor: Optional[Morphism] = None
 
-    def __eq__(self, other: 'Transition') -> bool:
-        return self._maximal_subrule == other._maximal_subrule
-
-    def __ne__(self, other: 'Transition') -> bool:
-        return not self == other
-
-    def __hash__(self) -> int:
-        return 17 * hash(self._maximal_subrule)
+        self._embed_cache: Dict[RuleGraph, bool] = {}
 
     def __ge__(self, other: 'Transition') -> bool:
         return not self < other
@@ -37,6 +38,10 @@ class Transition:
     def __str__(self) -> str:
         return self.name
 
+    @property
+    def uid(self) -> int:
+        return self._uid
+
     @property
     def name(self) -> str:
         return self.maximal_subrule.name
@@ -59,12 +64,31 @@ class Transition:
 
         return self._minimal_subrule_anchor
 
+    @staticmethod
+    def intern(rule_graph: RuleGraph) -> 'Transition':
+        transition: Optional[Transition] = _interned_transitions.get(rule_graph)
+
+        if transition is None:
+            transition = _interned_transitions.setdefault(rule_graph, Transition(rule_graph))
+
+        return transition
+
     @staticmethod
     def load(data: str, canonicaliser: GraphCanonicaliser) -> 'Transition':
-        return Transition(RuleGraph.from_rule(mod.ruleGMLString(data, add=False), canonicaliser))
+        return Transition.intern(RuleGraph.from_rule(mod.ruleGMLString(data, add=False), canonicaliser))
 
     def can_embed(self, pattern: RuleGraph) -> bool:
-        return any(self.maximal_subrule.embed(pattern))
+        embeddable: Optional[bool] = self._embed_cache.get(pattern)
+
+        if embeddable is None:
+            host_signature = self.maximal_subrule.label_signature
+
+            embeddable = all(host_signature[label] >= count
+                             for label, count in pattern.concrete_label_signature.items()) \
+                and any(self.maximal_subrule.embed_raw(pattern))
+            self._embed_cache[pattern] = embeddable
+
+        return embeddable
 
     def save(self) -> str:
         return self.maximal_subrule.rule.to_gml()
@@ -3,6 +3,7 @@ import mod
 import sys
 
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 from GTRI.canonicalisation import CanonicalGraph, GraphCanonicaliser
 from GTRI.ilp_model import model_from_iterated_map, ILPModel, ILPSolution
 from GTRI.iterated_map import IteratedMap
@@ -12,19 +13,26 @@ from os import listdir, path
 from typing import List
 
 
-def _parse_iterated_map(input_directory: str, canonicaliser: GraphCanonicaliser) -> IteratedMap:
-    graph_subdirectory = path.join(input_directory, "graphs")
+def _load_input_graph(file_path: str, canonicaliser: GraphCanonicaliser) -> CanonicalGraph:
+    return canonicaliser.canonicalise_graph(mod.Graph.fromGMLFile(file_path, add=False))
+
+
+def _load_transition(file_path: str, canonicaliser: GraphCanonicaliser) -> Transition:
+    return Transition.intern(RuleGraph.from_rule(mod.Rule.fromGMLFile(file_path, add=False), canonicaliser))
 
-    input_graphs: List[CanonicalGraph] = list(set(canonicaliser.canonicalise_graph(
-        mod.Graph.fromGMLFile(path.join(graph_subdirectory, file_name), add=False))
-                                                  for file_name in listdir(graph_subdirectory)))
 
+def _parse_iterated_map(input_directory: str, canonicaliser: GraphCanonicaliser) -> IteratedMap:
+    graph_subdirectory = path.join(input_directory, "graphs")
     rule_subdirectory = path.join(input_directory, "rules")
 
-    transitions: List[Transition] = list(set(
-        Transition(RuleGraph.from_rule(mod.Rule.fromGMLFile(path.join(rule_subdirectory, file_name), add=False),
-                                       canonicaliser)) for file_name in listdir(rule_subdirectory)
-    ))
+    with ThreadPoolExecutor() as executor:
+        input_graphs: List[CanonicalGraph] = list(set(executor.map(
+            lambda file_name: _load_input_graph(path.join(graph_subdirectory, file_name), canonicaliser),
+            listdir(graph_subdirectory))))
+
+        transitions: List[Transition] = list(set(executor.map(
+            lambda file_name: _load_transition(path.join(rule_subdirectory, file_name), canonicaliser),
+            listdir(rule_subdirectory))))
 
     return IteratedMap(input_graphs, transitions, canonicaliser)
 